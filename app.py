@@ -15,15 +15,64 @@ O código abaixo pode ser executado com `streamlit run app.py` em um ambiente on
 biblioteca `streamlit` esteja instalada e onde o acesso à internet para consultas HTTP
 esteja habilitado. Se a internet não estiver disponível, a função de pesquisa retornará
 resultados vazios, mas o plano de treino continuará sendo gerado normalmente.
+
+Os cálculos numéricos (ver `ferramenta_matematica_treino`) permanecem em Python
+puro. A compilação com Numba foi avaliada e descartada: a função executa poucas
+operações escalares uma vez por requisição, e o custo de despacho e conversão de
+tipos do Numba superaria o próprio cálculo.
 """
 
 import json
 import math
 import random
-from typing import Any, Dict, List, Optional
+import time
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# `orjson` é opcional: quando disponível, decodifica as respostas da API de busca
+# diretamente dos bytes, mais rápido que o módulo `json` da biblioteca padrão.
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+@st.cache_resource
+def _get_session() -> requests.Session:
+    """Retorna a sessão HTTP compartilhada usada nas pesquisas.
+
+    A sessão fica em `st.cache_resource`, que sobrevive às reexecuções do script,
+    de modo que as conexões keep-alive com a API de busca são reaproveitadas
+    entre cliques, evitando um novo handshake TCP/TLS a cada consulta.
+    """
+    session = requests.Session()
+    # Falhas de conexão não são repetidas, para que o timeout de conexão de 2 s em
+    # `search_web` seja de fato o tempo máximo até detectar a rede indisponível.
+    session.mount(
+        "https://",
+        HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=1, connect=0)),
+    )
+    session.headers.update({"User-Agent": "ai_fitness_coach/1.0", "Accept-Encoding": "gzip"})
+    return session
+
+
+# Quantidade de planos mantidos em `st.session_state` para reexecuções com o mesmo perfil
+PLAN_CACHE_MAX_ENTRIES = 8
+
+# Após uma falha de conexão, as pesquisas da sessão são suspensas por este
+# intervalo (em segundos) em vez de aguardar o timeout de cada consulta novamente.
+# O prazo fica em `st.session_state["network_down_until"]`, em `time.monotonic()`.
+NETWORK_DOWN_COOLDOWN = 60.0
 
 
 def normalizar_objetivo(goal: str) -> str:
@@ -36,13 +85,16 @@ def normalizar_experiencia(level: str) -> str:
     return level.strip().lower() if level else ""
 
 
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
 def search_web(query: str, max_results: int = 4) -> List[Dict[str, str]]:
     """Realiza uma busca simples usando a API pública do DuckDuckGo.
 
     A função tenta acessar `https://api.duckduckgo.com` que retorna um JSON contendo
-    tópicos relacionados. Caso a requisição falhe (por exemplo, por falta de acesso
-    à internet), a função retorna uma lista vazia com um item de erro para que o
-    usuário tenha ciência do problema.
+    tópicos relacionados. Os resultados ficam em cache por uma hora, de modo que
+    gerar o plano novamente com o mesmo objetivo e frequência não repete as
+    requisições HTTP. Caso a requisição falhe (por exemplo, por falta de acesso
+    à internet), a exceção é propagada: o Streamlit não armazena exceções em
+    cache, e cabe a quem chama exibir o aviso ao usuário.
 
     Parameters
     ----------
@@ -59,48 +111,269 @@ def search_web(query: str, max_results: int = 4) -> List[Dict[str, str]]:
     results: List[Dict[str, str]] = []
     if not query:
         return results
+    # Utiliza a API de consulta da DuckDuckGo. O parâmetro `no_redirect` evita
+    # redirecionamentos e `no_html` remove tags HTML do resultado.
+    resp = _get_session().get(
+        "https://api.duckduckgo.com/",
+        params={"q": query, "format": "json", "no_redirect": 1, "no_html": 1},
+        # (conexão, leitura): falhas de DNS/TCP são detectadas em até 2 s
+        timeout=(2.0, 5.0),
+    )
+    resp.raise_for_status()
+    data = _json_loads(resp.content)
+    # A API retorna uma lista de tópicos relacionados em "RelatedTopics". Cada tópico
+    # pode conter sub‑listas em "Topics"; percorremos a árvore em profundidade com
+    # uma pilha explícita, parando assim que `max_results` itens forem coletados.
+    pending = deque(data.get('RelatedTopics', []))
+    while pending and len(results) < max_results:
+        item = pending.popleft()
+        # Elementos com campo 'Text' são resultados diretos. O esquema da API
+        # garante dicionários nestes níveis, então em vez de checar o tipo de cada
+        # nó apenas ignoramos os que não tiverem o formato esperado.
+        try:
+            results.append(
+                {
+                    "title": item["Text"],
+                    "snippet": "",
+                    "url": item.get("FirstURL", ""),
+                }
+            )
+        except (KeyError, TypeError):
+            pass
+        # Em alguns casos há sub tópicos agrupados em "Topics"; eles são
+        # visitados antes dos próximos itens para manter a ordem original.
+        try:
+            sub_topics = item["Topics"]
+        except (KeyError, TypeError):
+            continue
+        if sub_topics:
+            pending.extendleft(reversed(sub_topics))
+    return results
+
+
+def pesquisar_com_seguranca(
+    query: str, max_results: int = 4
+) -> Tuple[List[Dict[str, str]], Optional[str], bool]:
+    """Executa `search_web` sem propagar falhas.
+
+    Retorna a lista de resultados, uma mensagem descrevendo a falha (ou `None`)
+    e se a falha foi um erro de conexão. Assim uma consulta com problema não
+    interrompe as demais, e a falha não fica registrada no cache de
+    `search_web`. A função roda em threads auxiliares, sem acesso a
+    `st.session_state`; cabe a `main()` usar o indicador de erro de conexão
+    para suspender as próximas pesquisas da sessão.
+    """
     try:
-        # Utiliza a API de consulta da DuckDuckGo. O parâmetro `no_redirect` evita
-        # redirecionamentos e `no_html` remove tags HTML do resultado.
-        resp = requests.get(
-            "https://api.duckduckgo.com/",
-            params={"q": query, "format": "json", "no_redirect": 1, "no_html": 1},
-            timeout=10,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        # A API retorna uma lista de tópicos relacionados em "RelatedTopics". Cada tópico
-        # pode conter sub‑listas em "Topics"; percorremos recursivamente para coletar
-        # títulos e URLs.
-        def extract_topics(items):
-            for item in items:
-                if isinstance(item, dict):
-                    # Elementos com campo 'Text' são resultados diretos
-                    if 'Text' in item:
-                        title = item.get('Text', '')
-                        url = item.get('FirstURL', '')
-                        yield {
-                            "title": title,
-                            "snippet": "",
-                            "url": url,
-                        }
-                    # Em alguns casos há sub tópicos agrupados em "Topics"
-                    if 'Topics' in item and isinstance(item['Topics'], list):
-                        for sub in extract_topics(item['Topics']):
-                            yield sub
-        topics = list(extract_topics(data.get('RelatedTopics', [])))
-        results.extend(topics[:max_results])
+        return search_web(query, max_results=max_results), None, False
+    except requests.exceptions.ConnectionError as exc:
+        return [], f"Falha ao consultar a API de busca: {exc}", True
     except Exception as exc:
-        # Caso a API falhe (por falta de conexão ou qualquer outra razão), retorna
-        # um único registro informando o erro.
-        results.append(
-            {
-                "title": "Erro na pesquisa",
-                "snippet": f"Falha ao consultar a API de busca: {exc}",
-                "url": "",
-            }
-        )
-    return results
+        return [], f"Falha ao consultar a API de busca: {exc}", False
+
+
+# Parâmetros basais por objetivo
+GOAL_PRESETS = {
+    "hipertrofia": {
+        "met": 6.0,
+        "duration_hours": 1.2,
+        "rep_range": "6-12",
+        "intensity": "70-80% 1RM",
+    },
+    "emagrecimento": {
+        "met": 5.5,
+        "duration_hours": 1.15,
+        "rep_range": "12-15",
+        "intensity": "Circuitos com pausa curta",
+    },
+    "forca": {
+        "met": 6.8,
+        "duration_hours": 1.25,
+        "rep_range": "3-6",
+        "intensity": "80-90% 1RM",
+    },
+    "condicionamento": {
+        "met": 7.2,
+        "duration_hours": 1.05,
+        "rep_range": "10-15",
+        "intensity": "Intervalos moderados",
+    },
+}
+
+VOLUME_TABLE = {
+    "iniciante": "14-18 séries por grupamento",
+    "intermediario": "18-22 séries por grupamento",
+    "avancado": "22-26 séries por grupamento",
+}
+
+# Dicionários de exercícios por grupamento (tuplas imutáveis; `random.sample`
+# aceita qualquer sequência)
+EXERCISE_DICT = {
+    "chest": (
+        "Supino reto com barra",
+        "Supino inclinado com halteres",
+        "Crucifixo na máquina",
+        "Peck deck",
+        "Flexões",
+    ),
+    "triceps": (
+        "Tríceps pulley",
+        "Tríceps testa",
+        "Mergulho banco",
+        "Tríceps corda",
+        "Kickback",
+    ),
+    "back": (
+        "Puxada frontal",
+        "Remada curvada com barra",
+        "Remada unilateral com haltere",
+        "Pulldown",
+        "Levantamento terra",
+    ),
+    "biceps": (
+        "Rosca direta com barra",
+        "Rosca alternada",
+        "Rosca martelo",
+        "Rosca concentrada",
+        "Rosca Scott",
+    ),
+    "legs": (
+        "Agachamento livre",
+        "Leg press",
+        "Cadeira extensora",
+        "Cadeira flexora",
+        "Afundo com halteres",
+        "Panturrilha em pé",
+    ),
+    "shoulders": (
+        "Desenvolvimento com barra",
+        "Desenvolvimento com halteres",
+        "Elevação lateral",
+        "Elevação frontal",
+        "Remada alta",
+    ),
+    "glutes": (
+        "Agachamento sumô",
+        "Peso morto stiff",
+        "Glute bridge",
+        "Cadeira abdutora",
+        "Elevação de quadril",
+    ),
+    "abs": (
+        "Prancha",
+        "Abdominal supra",
+        "Elevação de pernas",
+        "Abdominal oblíquo",
+        "Prancha lateral",
+    ),
+}
+
+# Exercícios de cardio/condicionamento utilizados em emagrecimento e condicionamento
+CARDIO_EXERCISES = (
+    "Burpees",
+    "Mountain climbers",
+    "Agachamento com salto",
+    "Polichinelos",
+    "Corrida estacionária",
+    "Pular corda",
+    "Kettlebell swing",
+    "Clean and press com halteres leves",
+    "Flexões",
+    "Abdominal bicicleta",
+)
+
+# Estruturas de divisões para cada objetivo
+HYPERTROPHY_SPLITS = [
+    {
+        "name": "Treino A - Peito e Tríceps",
+        "muscles": ["chest", "triceps"],
+        "focus": "Peito e Tríceps",
+    },
+    {
+        "name": "Treino B - Costas e Bíceps",
+        "muscles": ["back", "biceps"],
+        "focus": "Costas e Bíceps",
+    },
+    {
+        "name": "Treino C - Pernas e Ombros",
+        "muscles": ["legs", "shoulders"],
+        "focus": "Pernas e Ombros",
+    },
+    {
+        "name": "Treino D - Peito e Costas",
+        "muscles": ["chest", "back"],
+        "focus": "Peito e Costas",
+    },
+    {
+        "name": "Treino E - Pernas e Glúteos",
+        "muscles": ["legs", "glutes"],
+        "focus": "Pernas e Glúteos",
+    },
+    {
+        "name": "Treino F - Ombros e Braços",
+        "muscles": ["shoulders", "biceps", "triceps"],
+        "focus": "Ombros e Braços",
+    },
+]
+
+STRENGTH_SPLITS = [
+    {
+        "name": "Treino A - Agachamento",
+        "muscles": ["legs", "glutes", "back"],
+        "focus": "Força em Agachamento",
+    },
+    {
+        "name": "Treino B - Supino e Press",
+        "muscles": ["chest", "shoulders", "triceps"],
+        "focus": "Força em Supino",
+    },
+    {
+        "name": "Treino C - Deadlift",
+        "muscles": ["legs", "back"],
+        "focus": "Força em Deadlift",
+    },
+    {
+        "name": "Treino D - Full Body",
+        "muscles": ["legs", "back", "chest", "shoulders"],
+        "focus": "Força Total",
+    },
+]
+
+CONDITIONING_SPLITS = [
+    {"name": "Circuito HIIT", "muscles": [], "focus": "Alta intensidade"},
+    {
+        "name": "Circuito de Resistência",
+        "muscles": [],
+        "focus": "Resistência Muscular",
+    },
+    {
+        "name": "Circuito Cardio e Força",
+        "muscles": [],
+        "focus": "Cardio e Força",
+    },
+    {"name": "Circuito Funcional", "muscles": [], "focus": "Funcional"},
+]
+
+EMAGRECIMENTO_SPLITS = [
+    {"name": "Circuito A", "muscles": [], "focus": "Circuito"},
+    {"name": "Circuito B", "muscles": [], "focus": "Circuito"},
+    {"name": "Circuito C", "muscles": [], "focus": "Circuito"},
+    {"name": "Circuito D", "muscles": [], "focus": "Circuito"},
+]
+
+SPLITS_BY_GOAL = {
+    "hipertrofia": HYPERTROPHY_SPLITS,
+    "forca": STRENGTH_SPLITS,
+    "condicionamento": CONDITIONING_SPLITS,
+    "emagrecimento": EMAGRECIMENTO_SPLITS,
+}
+
+# Prescrição padrão de cada exercício por objetivo
+GOAL_EX_TEMPLATE = {
+    "hipertrofia": {"sets": 4, "reps": "8-12", "rest": "60-90s", "notes": ""},
+    "forca": {"sets": 4, "reps": "4-6", "rest": "2-3min", "notes": ""},
+    "emagrecimento": {"sets": 3, "reps": "12-15", "rest": "30s", "notes": ""},
+    "condicionamento": {"sets": 3, "reps": "10-15", "rest": "30-60s", "notes": ""},
+}
 
 
 def ferramenta_matematica_treino(
@@ -124,46 +397,15 @@ def ferramenta_matematica_treino(
         Dicionário contendo métricas analíticas.
     """
     goal_key = normalizar_objetivo(primary_goal)
-    # Parâmetros basais por objetivo
-    goal_presets = {
-        "hipertrofia": {
-            "met": 6.0,
-            "duration_hours": 1.2,
-            "rep_range": "6-12",
-            "intensity": "70-80% 1RM",
-        },
-        "emagrecimento": {
-            "met": 5.5,
-            "duration_hours": 1.15,
-            "rep_range": "12-15",
-            "intensity": "Circuitos com pausa curta",
-        },
-        "forca": {
-            "met": 6.8,
-            "duration_hours": 1.25,
-            "rep_range": "3-6",
-            "intensity": "80-90% 1RM",
-        },
-        "condicionamento": {
-            "met": 7.2,
-            "duration_hours": 1.05,
-            "rep_range": "10-15",
-            "intensity": "Intervalos moderados",
-        },
-    }
-    preset = goal_presets.get(goal_key, goal_presets["hipertrofia"])
+    exp_key = normalizar_experiencia(experience_level)
+    preset = GOAL_PRESETS.get(goal_key, GOAL_PRESETS["hipertrofia"])
     bmi = None
     if height_cm:
         height_m = height_cm / 100.0
         bmi = round(weight_kg / (height_m ** 2), 2)
     session_calories = round(weight_kg * preset["met"] * preset["duration_hours"], 1)
     weekly_calories = round(session_calories * training_frequency, 1)
-    volume_table = {
-        "iniciante": "14-18 séries por grupamento",
-        "intermediario": "18-22 séries por grupamento",
-        "avancado": "22-26 séries por grupamento",
-    }
-    volume = volume_table.get(normalizar_experiencia(experience_level), "18-22 séries por grupamento")
+    volume = VOLUME_TABLE.get(exp_key, "18-22 séries por grupamento")
     return {
         "goal": goal_key,
         "estimated_session_calories": session_calories,
@@ -173,7 +415,7 @@ def ferramenta_matematica_treino(
         "recommended_intensity": preset["intensity"],
         "volume_per_session": volume,
         "sessions_per_week": training_frequency,
-        "experience_level": normalizar_experiencia(experience_level),
+        "experience_level": exp_key,
     }
 
 
@@ -185,7 +427,9 @@ def generate_plan(user_profile: Dict[str, Any], analytics: Dict[str, Any]) -> Di
     contendo sessões detalhadas com exercícios, e seções de recuperação,
     nutrição e progressão. A lógica foi simplificada para gerar treinos
     plausíveis sem depender de modelos de linguagem externos. Os exercícios
-    utilizados são escolhidos de listas predefinidas e adequadas ao objetivo.
+    utilizados são escolhidos de listas predefinidas e adequadas ao objetivo,
+    com um sorteio determinístico: o mesmo objetivo, frequência e nível de
+    experiência sempre resultam no mesmo plano, que fica em cache.
 
     Parameters
     ----------
@@ -199,258 +443,75 @@ def generate_plan(user_profile: Dict[str, Any], analytics: Dict[str, Any]) -> Di
     dict
         Estrutura de plano de treino pronta para ser convertida em Markdown.
     """
-    goal = user_profile["primary_goal"]
-    freq = user_profile["training_frequency"]
+    return _build_plan(
+        user_profile["primary_goal"],
+        user_profile["training_frequency"],
+        user_profile.get("experience_level"),
+    )
+
+
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def _build_plan(goal: str, freq: int, experience_level: Optional[str]) -> Dict[str, Any]:
+    """Monta o plano a partir dos únicos dados de que ele depende.
+
+    O cache fica indexado apenas por objetivo, frequência e nível; campos livres
+    do perfil, como restrições e notas, não criam novas entradas.
+    """
     total_sessions = 12
     weeks = (total_sessions + freq - 1) // freq
-    sessions_generated = 0
-    training_weeks: List[Dict[str, Any]] = []
-    # Dicionários de exercícios por grupamento
-    exercise_dict = {
-        "chest": [
-            "Supino reto com barra",
-            "Supino inclinado com halteres",
-            "Crucifixo na máquina",
-            "Peck deck",
-            "Flexões",
-        ],
-        "triceps": [
-            "Tríceps pulley",
-            "Tríceps testa",
-            "Mergulho banco",
-            "Tríceps corda",
-            "Kickback",
-        ],
-        "back": [
-            "Puxada frontal",
-            "Remada curvada com barra",
-            "Remada unilateral com haltere",
-            "Pulldown",
-            "Levantamento terra",
-        ],
-        "biceps": [
-            "Rosca direta com barra",
-            "Rosca alternada",
-            "Rosca martelo",
-            "Rosca concentrada",
-            "Rosca Scott",
-        ],
-        "legs": [
-            "Agachamento livre",
-            "Leg press",
-            "Cadeira extensora",
-            "Cadeira flexora",
-            "Afundo com halteres",
-            "Panturrilha em pé",
-        ],
-        "shoulders": [
-            "Desenvolvimento com barra",
-            "Desenvolvimento com halteres",
-            "Elevação lateral",
-            "Elevação frontal",
-            "Remada alta",
-        ],
-        "glutes": [
-            "Agachamento sumô",
-            "Peso morto stiff",
-            "Glute bridge",
-            "Cadeira abdutora",
-            "Elevação de quadril",
-        ],
-        "abs": [
-            "Prancha",
-            "Abdominal supra",
-            "Elevação de pernas",
-            "Abdominal oblíquo",
-            "Prancha lateral",
-        ],
-    }
-    # Exercícios de cardio/condicionamento utilizados em emagrecimento e condicionamento
-    cardio_exercises = [
-        "Burpees",
-        "Mountain climbers",
-        "Agachamento com salto",
-        "Polichinelos",
-        "Corrida estacionária",
-        "Pular corda",
-        "Kettlebell swing",
-        "Clean and press com halteres leves",
-        "Flexões",
-        "Abdominal bicicleta",
-    ]
-    # Estruturas de divisões para cada objetivo
-    hypertrophy_splits = [
-        {
-            "name": "Treino A - Peito e Tríceps",
-            "muscles": ["chest", "triceps"],
-            "focus": "Peito e Tríceps",
-        },
-        {
-            "name": "Treino B - Costas e Bíceps",
-            "muscles": ["back", "biceps"],
-            "focus": "Costas e Bíceps",
-        },
-        {
-            "name": "Treino C - Pernas e Ombros",
-            "muscles": ["legs", "shoulders"],
-            "focus": "Pernas e Ombros",
-        },
-        {
-            "name": "Treino D - Peito e Costas",
-            "muscles": ["chest", "back"],
-            "focus": "Peito e Costas",
-        },
-        {
-            "name": "Treino E - Pernas e Glúteos",
-            "muscles": ["legs", "glutes"],
-            "focus": "Pernas e Glúteos",
-        },
-        {
-            "name": "Treino F - Ombros e Braços",
-            "muscles": ["shoulders", "biceps", "triceps"],
-            "focus": "Ombros e Braços",
-        },
-    ]
-    strength_splits = [
-        {
-            "name": "Treino A - Agachamento",
-            "muscles": ["legs", "glutes", "back"],
-            "focus": "Força em Agachamento",
-        },
-        {
-            "name": "Treino B - Supino e Press",
-            "muscles": ["chest", "shoulders", "triceps"],
-            "focus": "Força em Supino",
-        },
-        {
-            "name": "Treino C - Deadlift",
-            "muscles": ["legs", "back"],
-            "focus": "Força em Deadlift",
-        },
-        {
-            "name": "Treino D - Full Body",
-            "muscles": ["legs", "back", "chest", "shoulders"],
-            "focus": "Força Total",
-        },
-    ]
-    conditioning_splits = [
-        {"name": "Circuito HIIT", "muscles": [], "focus": "Alta intensidade"},
-        {
-            "name": "Circuito de Resistência",
-            "muscles": [],
-            "focus": "Resistência Muscular",
-        },
-        {
-            "name": "Circuito Cardio e Força",
-            "muscles": [],
-            "focus": "Cardio e Força",
-        },
-        {"name": "Circuito Funcional", "muscles": [], "focus": "Funcional"},
-    ]
-    emagrecimento_splits = [
-        {"name": "Circuito A", "muscles": [], "focus": "Circuito"},
-        {"name": "Circuito B", "muscles": [], "focus": "Circuito"},
-        {"name": "Circuito C", "muscles": [], "focus": "Circuito"},
-        {"name": "Circuito D", "muscles": [], "focus": "Circuito"},
-    ]
+    # Séries, repetições e descanso dependem apenas do objetivo: resolvidos uma vez por plano
+    ex_template = GOAL_EX_TEMPLATE.get(goal, GOAL_EX_TEMPLATE["condicionamento"])
+    splits = SPLITS_BY_GOAL.get(goal, EMAGRECIMENTO_SPLITS)
+    n_splits = len(splits)
+    # Gerador próprio, semeado pelo perfil: o mesmo perfil sempre produz o mesmo
+    # plano, o que permite guardar o resultado em cache com `st.cache_data`.
+    # `pick_exercises` usa este gerador via closure.
+    seed = zlib.crc32(f"{goal}|{freq}|{experience_level}".encode("utf-8"))
+    rng = random.Random(seed)
 
     def pick_exercises(muscles: List[str], obj: str) -> List[str]:
         """Seleciona uma lista de exercícios com base nos grupamentos ou cardio."""
-        exercises: List[str] = []
         if obj in {"hipertrofia", "forca"}:
-            for muscle in muscles:
-                choices = exercise_dict.get(muscle, [])
-                if choices:
-                    # Seleciona até 2 exercícios aleatórios por grupamento para dar variedade
-                    selected = random.sample(choices, min(2, len(choices)))
-                    exercises.extend(selected)
-            random.shuffle(exercises)
-            # Limita a 6 exercícios no máximo
-            exercises = exercises[:6]
+            # Seleciona até 2 exercícios aleatórios por grupamento para dar variedade e
+            # sorteia no máximo 6 deles, já em ordem aleatória
+            pool = [
+                ex
+                for m in muscles
+                if m in EXERCISE_DICT
+                for ex in rng.sample(EXERCISE_DICT[m], min(2, len(EXERCISE_DICT[m])))
+            ]
+            exercises = rng.sample(pool, min(6, len(pool)))
         else:
             # Emagrecimento e condicionamento usam exercícios de cardio/funcionais
-            exercises = random.sample(cardio_exercises, 5)
+            exercises = rng.sample(CARDIO_EXERCISES, 5)
         return exercises
 
-    # Loop para construir as semanas e sessões
-    for week_num in range(1, weeks + 1):
-        week_sessions: List[Dict[str, Any]] = []
-        # Dentro de cada semana geramos `freq` sessões ou até atingir 12 no total
-        for day in range(1, freq + 1):
-            if sessions_generated >= total_sessions:
-                break
-            if goal == "hipertrofia":
-                split = hypertrophy_splits[sessions_generated % len(hypertrophy_splits)]
-            elif goal == "forca":
-                split = strength_splits[sessions_generated % len(strength_splits)]
-            elif goal == "condicionamento":
-                split = conditioning_splits[sessions_generated % len(conditioning_splits)]
-            else:  # emagrecimento
-                split = emagrecimento_splits[sessions_generated % len(emagrecimento_splits)]
-            exercises = pick_exercises(split["muscles"], goal)
-            ex_list: List[Dict[str, Any]] = []
-            for ex in exercises:
-                if goal == "hipertrofia":
-                    ex_list.append(
-                        {
-                            "exercise": ex,
-                            "sets": 4,
-                            "reps": "8-12",
-                            "rest": "60-90s",
-                            "notes": "",
-                        }
-                    )
-                elif goal == "forca":
-                    ex_list.append(
-                        {
-                            "exercise": ex,
-                            "sets": 4,
-                            "reps": "4-6",
-                            "rest": "2-3min",
-                            "notes": "",
-                        }
-                    )
-                elif goal == "emagrecimento":
-                    ex_list.append(
-                        {
-                            "exercise": ex,
-                            "sets": 3,
-                            "reps": "12-15",
-                            "rest": "30s",
-                            "notes": "",
-                        }
-                    )
-                else:  # condicionamento
-                    ex_list.append(
-                        {
-                            "exercise": ex,
-                            "sets": 3,
-                            "reps": "10-15",
-                            "rest": "30-60s",
-                            "notes": "",
-                        }
-                    )
-            session = {
-                "day": day,
-                "name": split["name"],
-                "focus": split["focus"],
-                "resumo": "",
-                "exercises": ex_list,
-                "conditioning": None,
-                "mobility": None,
-                "progression": None,
-            }
-            week_sessions.append(session)
-            sessions_generated += 1
-        training_weeks.append(
-            {
-                "week": week_num,
-                "focus": f"Semana de {goal}",
-                "sessions": week_sessions,
-            }
-        )
-        if sessions_generated >= total_sessions:
-            break
+    # Um único laço gera as 12 sessões; semana e dia são derivados do índice
+    flat_sessions: List[Tuple[int, Dict[str, Any]]] = []
+    for i in range(total_sessions):
+        split = splits[i % n_splits]
+        exercises = pick_exercises(split["muscles"], goal)
+        ex_list: List[Dict[str, Any]] = [{"exercise": ex, **ex_template} for ex in exercises]
+        session = {
+            "day": i % freq + 1,
+            "name": split["name"],
+            "focus": split["focus"],
+            "resumo": "",
+            "exercises": ex_list,
+            "conditioning": None,
+            "mobility": None,
+            "progression": None,
+        }
+        flat_sessions.append((i // freq + 1, session))
+    # Agrupa as sessões consecutivas de cada semana
+    training_weeks: List[Dict[str, Any]] = [
+        {
+            "week": week_num,
+            "focus": f"Semana de {goal}",
+            "sessions": [session for _, session in group],
+        }
+        for week_num, group in groupby(flat_sessions, key=itemgetter(0))
+    ]
     # Construção do dicionário final
     plan_payload: Dict[str, Any] = {
         "overview": {
@@ -479,109 +540,131 @@ def generate_plan(user_profile: Dict[str, Any], analytics: Dict[str, Any]) -> Di
     return plan_payload
 
 
-def render_plan_markdown(plan_payload: Dict[str, Any]) -> str:
-    """Converte o dicionário de plano em texto Markdown legível.
+def _iter_overview_lines(overview: Dict[str, Any]) -> Iterator[str]:
+    """Gera as linhas da seção de visão geral do plano."""
+    yield "## Visão geral"
+    primary_goal = overview.get("primary_goal")
+    if primary_goal:
+        yield f"- **Objetivo principal:** {primary_goal}"
+    focus_points = overview.get("focus_points")
+    if focus_points:
+        if isinstance(focus_points, list):
+            focus_str = ", ".join(str(fp) for fp in focus_points)
+        else:
+            focus_str = str(focus_points)
+        yield f"- **Pontos de foco:** {focus_str}"
+    macro_weeks = overview.get("macrocycle_length_weeks")
+    if macro_weeks:
+        yield f"- **Duração do macrociclo:** {macro_weeks} semanas"
+    yield ""
+
+
+def _iter_bullet_section_lines(title: str, items: List[str]) -> Iterator[str]:
+    """Gera uma seção com título e uma lista simples de itens."""
+    yield f"## {title}"
+    for item in items:
+        yield f"- {item}"
+    yield ""
+
+
+def _iter_week_lines(week: Dict[str, Any]) -> Iterator[str]:
+    """Gera as linhas das sessões de uma semana, sem o cabeçalho da semana."""
+    sessions = week.get("sessions", [])
+    for session_idx, session in enumerate(sessions, 1):
+        name = session["name"] or f"Sessão {session_idx}"
+        focus_sess = session["focus"]
+        yield f"#### {name} – {focus_sess}" if focus_sess else f"#### {name}"
+        resumo = session.get("resumo")
+        if resumo:
+            yield f"{resumo}"
+        exercises = session.get("exercises", [])
+        if exercises:
+            yield "##### Exercícios"
+            for ex in exercises:
+                # `generate_plan` sempre preenche estes campos; apenas `notes` é opcional
+                exercise_name = ex["exercise"]
+                sets = ex["sets"]
+                reps = ex["reps"]
+                rest = ex["rest"]
+                notes = ex.get("notes")
+                rep_str = f"{sets}x {reps} descanso {rest}" if sets is not None else ""
+                yield f"- {exercise_name} {rep_str}" + (f" – {notes}" if notes else "")
+        conditioning = session.get("conditioning")
+        if conditioning:
+            yield f"- **Condicionamento:** {conditioning}"
+        mobility = session.get("mobility")
+        if mobility:
+            yield f"- **Mobilidade:** {mobility}"
+        progression = session.get("progression")
+        if progression:
+            yield f"- **Progressão:** {progression}"
+        yield ""
+
+
+def week_title(week: Dict[str, Any]) -> str:
+    """Retorna o título de uma semana, por exemplo "Semana 1: Semana de hipertrofia"."""
+    focus = week.get("focus")
+    return f"Semana {week.get('week')}: {focus}" if focus else f"Semana {week.get('week')}"
+
+
+def render_week_markdown(week: Dict[str, Any]) -> str:
+    """Converte as sessões de uma única semana em Markdown."""
+    return "\n".join(_iter_week_lines(week))
+
+
+def render_plan_sections(plan_payload: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Converte o plano em blocos de Markdown independentes.
+
+    Renderizar o plano em vários blocos pequenos, em vez de um único texto
+    longo, permite que a interface exiba cada semana em um `st.expander` e
+    mantém cada chamada de `st.markdown` curta.
 
-    Esta função segue de perto a implementação do notebook para renderizar
-    o plano final em Markdown, com seções organizadas e listas formatadas.
+    Returns
+    -------
+    dict
+        Dicionário com as chaves 'intro' (visão geral e diretrizes), 'weeks'
+        (lista de pares título/Markdown, um por semana) e 'closing'
+        (recuperação, nutrição e progressão).
     """
-    lines: List[str] = []
+    intro: List[str] = []
     overview = plan_payload.get("overview", {})
     if overview:
-        lines.append("## Visão geral")
-        primary_goal = overview.get("primary_goal")
-        if primary_goal:
-            lines.append(f"- **Objetivo principal:** {primary_goal}")
-        focus_points = overview.get("focus_points")
-        if focus_points:
-            if isinstance(focus_points, list):
-                focus_str = ", ".join(str(fp) for fp in focus_points)
-            else:
-                focus_str = str(focus_points)
-            lines.append(f"- **Pontos de foco:** {focus_str}")
-        macro_weeks = overview.get("macrocycle_length_weeks")
-        if macro_weeks:
-            lines.append(f"- **Duração do macrociclo:** {macro_weeks} semanas")
-        lines.append("")
+        intro.append("\n".join(_iter_overview_lines(overview)))
     guidelines = plan_payload.get("guidelines")
     if guidelines:
-        lines.append("## Diretrizes")
-        for item in guidelines:
-            lines.append(f"- {item}")
-        lines.append("")
-    training_weeks = plan_payload.get("training_weeks")
-    if training_weeks:
-        lines.append("## Semanas de treino")
-        for week in training_weeks:
-            week_num = week.get("week")
-            focus = week.get("focus")
-            if week_num is not None:
-                header = f"### Semana {week_num}"
-                if focus:
-                    header += f": {focus}"
-                lines.append(header)
-            sessions = week.get("sessions", [])
-            for session_idx, session in enumerate(sessions, 1):
-                day = session.get("day")
-                name = session.get("name") or f"Sessão {session_idx}"
-                focus_sess = session.get("focus")
-                session_header = f"#### {name}" if name else "#### Sessão"
-                if focus_sess:
-                    session_header += f" – {focus_sess}"
-                lines.append(session_header)
-                resumo = session.get("resumo")
-                if resumo:
-                    lines.append(f"{resumo}")
-                exercises = session.get("exercises", [])
-                if exercises:
-                    lines.append("##### Exercícios")
-                    for ex in exercises:
-                        exercise_name = ex.get("exercise")
-                        sets = ex.get("sets")
-                        reps = ex.get("reps")
-                        rest = ex.get("rest")
-                        notes = ex.get("notes")
-                        parts: List[str] = []
-                        if sets is not None:
-                            parts.append(f"{sets}x")
-                        if reps is not None:
-                            parts.append(str(reps))
-                        if rest:
-                            parts.append(f"descanso {rest}")
-                        rep_str = " ".join(parts)
-                        line = f"- {exercise_name} {rep_str}" if exercise_name else "-"
-                        if notes:
-                            line += f" – {notes}"
-                        lines.append(line)
-                conditioning = session.get("conditioning")
-                if conditioning:
-                    lines.append(f"- **Condicionamento:** {conditioning}")
-                mobility = session.get("mobility")
-                if mobility:
-                    lines.append(f"- **Mobilidade:** {mobility}")
-                progression = session.get("progression")
-                if progression:
-                    lines.append(f"- **Progressão:** {progression}")
-                lines.append("")
-        lines.append("")
+        intro.append("\n".join(_iter_bullet_section_lines("Diretrizes", guidelines)))
+    weeks = [
+        (week_title(week), render_week_markdown(week))
+        for week in plan_payload.get("training_weeks") or []
+    ]
+    closing: List[str] = []
     recovery = plan_payload.get("recovery")
     if recovery:
-        lines.append("## Recuperação")
-        for item in recovery:
-            lines.append(f"- {item}")
-        lines.append("")
+        closing.append("\n".join(_iter_bullet_section_lines("Recuperação", recovery)))
     nutrition = plan_payload.get("nutrition_tips")
     if nutrition:
-        lines.append("## Dicas de nutrição")
-        for tip in nutrition:
-            lines.append(f"- {tip}")
-        lines.append("")
+        closing.append("\n".join(_iter_bullet_section_lines("Dicas de nutrição", nutrition)))
     progression_strategy = plan_payload.get("progression_strategy")
     if progression_strategy:
-        lines.append("## Estratégia de progressão")
-        lines.append(progression_strategy)
-        lines.append("")
-    return "\n".join(lines)
+        closing.append(f"## Estratégia de progressão\n{progression_strategy}\n")
+    return {"intro": intro, "weeks": weeks, "closing": closing}
+
+
+def render_plan_markdown(plan_payload: Dict[str, Any]) -> str:
+    """Converte o dicionário de plano em um único texto Markdown legível.
+
+    Esta função segue de perto a implementação do notebook para renderizar
+    o plano final em Markdown, com seções organizadas e listas formatadas.
+    O texto é montado a partir dos mesmos blocos de `render_plan_sections`.
+    """
+    sections = render_plan_sections(plan_payload)
+    parts: List[str] = list(sections["intro"])
+    if sections["weeks"]:
+        parts.append("## Semanas de treino")
+        parts.extend(f"### {title}\n{week_md}" for title, week_md in sections["weeks"])
+        parts.append("")
+    parts.extend(sections["closing"])
+    return "\n".join(parts)
 
 
 def formatar_analises(analises: Dict[str, Any]) -> str:
@@ -605,23 +688,22 @@ def resumir_pesquisa_web(pesquisa: List[Dict[str, Any]]) -> List[str]:
 
     Para cada consulta, pega o primeiro resultado (título ou URL) e gera
     uma frase curta que pode ser apresentada ao usuário como referência.
+    Consultas sem resultados (vazias ou que falharam) são omitidas.
     """
     summaries: List[str] = []
     for item in pesquisa or []:
         query = item.get("query", "")
         results = item.get("results", [])
-        resumo: Optional[str] = None
-        if isinstance(results, list) and results:
-            first = results[0]
-            if isinstance(first, dict):
-                title = first.get("title") or first.get("url") or first.get("snippet")
-                resumo = title if title else str(first)
-            else:
-                resumo = str(first)
+        if not isinstance(results, list) or not results:
+            continue
+        first = results[0]
+        if isinstance(first, dict):
+            title = first.get("title") or first.get("url") or first.get("snippet")
+            resumo = title if title else str(first)
+        else:
+            resumo = str(first)
         if resumo:
             summaries.append(f"{query}: {resumo}")
-        else:
-            summaries.append(query)
     return summaries
 
 
@@ -684,56 +766,107 @@ def main() -> None:
                 except ValueError:
                     st.error("Altura inválida. Informe somente números (ex: 175).")
                     return
-            # Cálculos analíticos
-            try:
-                analises = ferramenta_matematica_treino(
-                    age=user_profile["age"],
-                    weight_kg=user_profile["weight_kg"],
-                    training_frequency=user_profile["training_frequency"],
-                    primary_goal=user_profile["primary_goal"],
-                    height_cm=user_profile.get("height_cm"),
-                    experience_level=user_profile.get("experience_level", "iniciante"),
-                )
-            except Exception as exc:
-                st.error(f"Erro nos cálculos: {exc}")
-                return
-            # Pesquisas na web – três queries diferentes para enriquecer o plano
-            queries = [
-                f"treino de musculação {user_profile['primary_goal']} {user_profile['training_frequency']} dias por semana",
-                f"melhores exercícios para {user_profile['primary_goal']} academia",
-                f"estratégias de treino para {user_profile['primary_goal']}",
-            ]
-            research_payload: List[Dict[str, Any]] = []
-            for q in queries:
-                results = search_web(q, max_results=4)
-                research_payload.append({"query": q, "results": results})
-            # Gerar plano de treino
-            plan_payload = generate_plan(user_profile, analises)
-            # Converter plano em Markdown para exibição
-            plan_markdown = render_plan_markdown(plan_payload)
-            # Mostrar perfil validado
+            # Reexecuções com o mesmo perfil reaproveitam o resultado já calculado
+            plan_cache = st.session_state.setdefault("plan_cache", OrderedDict())
+            profile_key = tuple(sorted(user_profile.items()))
+            cached = plan_cache.get(profile_key)
+            if cached is not None:
+                plan_cache.move_to_end(profile_key)
+                analises, research_payload, plan_sections = cached
+            else:
+                # Cálculos analíticos
+                try:
+                    analises = ferramenta_matematica_treino(
+                        age=user_profile["age"],
+                        weight_kg=user_profile["weight_kg"],
+                        training_frequency=user_profile["training_frequency"],
+                        primary_goal=user_profile["primary_goal"],
+                        height_cm=user_profile.get("height_cm"),
+                        experience_level=user_profile.get("experience_level", "iniciante"),
+                    )
+                except Exception as exc:
+                    st.error(f"Erro nos cálculos: {exc}")
+                    return
+                # Pesquisas na web – três queries diferentes para enriquecer o plano
+                queries = [
+                    f"treino de musculação {user_profile['primary_goal']} {user_profile['training_frequency']} dias por semana",
+                    f"melhores exercícios para {user_profile['primary_goal']} academia",
+                    f"estratégias de treino para {user_profile['primary_goal']}",
+                ]
+                search_failed = False
+                if time.monotonic() < st.session_state.get("network_down_until", 0.0):
+                    # Uma falha de conexão recente nesta sessão: não espera o timeout
+                    # de novo até o fim de `NETWORK_DOWN_COOLDOWN`
+                    st.warning("Sem conexão com a internet; pesquisas na web ignoradas temporariamente.")
+                    outcomes = [([], None, False) for _ in queries]
+                    search_failed = True
+                else:
+                    # As consultas são independentes e limitadas por I/O de rede, então
+                    # são disparadas em paralelo; o tempo total passa a ser o da mais lenta.
+                    with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+                        outcomes = list(
+                            executor.map(lambda q: pesquisar_com_seguranca(q, max_results=4), queries)
+                        )
+                    if any(conexao_falhou for _, _, conexao_falhou in outcomes):
+                        st.session_state["network_down_until"] = (
+                            time.monotonic() + NETWORK_DOWN_COOLDOWN
+                        )
+                research_payload: List[Dict[str, Any]] = [
+                    {"query": q, "results": results}
+                    for q, (results, _, _) in zip(queries, outcomes)
+                ]
+                for q, (_, erro, _) in zip(queries, outcomes):
+                    if erro:
+                        st.warning(f"Erro na pesquisa \"{q}\": {erro}")
+                        search_failed = True
+                # Gerar plano de treino
+                plan_payload = generate_plan(user_profile, analises)
+                # Converter plano em blocos de Markdown para exibição
+                plan_sections = render_plan_sections(plan_payload)
+                # Falhas de pesquisa não são guardadas, para que a próxima tentativa
+                # consulte a web novamente
+                if not search_failed:
+                    plan_cache[profile_key] = (analises, research_payload, plan_sections)
+                    if len(plan_cache) > PLAN_CACHE_MAX_ENTRIES:
+                        plan_cache.popitem(last=False)
+            # Mostrar perfil validado. As listas simples abaixo usam `st.text`, que
+            # não passa pelo processamento de Markdown.
             st.subheader("Perfil validado")
-            st.markdown(f"- **Idade:** {user_profile['age']} anos")
-            st.markdown(f"- **Peso:** {user_profile['weight_kg']} kg")
+            perfil = [
+                f"- Idade: {user_profile['age']} anos",
+                f"- Peso: {user_profile['weight_kg']} kg",
+            ]
             if user_profile.get("height_cm"):
-                st.markdown(f"- **Altura:** {user_profile['height_cm']} cm")
-            st.markdown(
-                f"- **Frequência semanal:** {user_profile['training_frequency']} dias"
+                perfil.append(f"- Altura: {user_profile['height_cm']} cm")
+            perfil.extend(
+                [
+                    f"- Frequência semanal: {user_profile['training_frequency']} dias",
+                    f"- Objetivo: {user_profile['primary_goal']}",
+                    f"- Nível: {user_profile['experience_level']}",
+                ]
             )
-            st.markdown(f"- **Objetivo:** {user_profile['primary_goal']}")
-            st.markdown(f"- **Nível:** {user_profile['experience_level']}")
+            st.text("\n".join(perfil))
             # Mostrar análises
             st.subheader("Insights analíticos")
-            st.markdown(formatar_analises(analises))
+            st.text(formatar_analises(analises))
             # Mostrar resumo de pesquisa
             resumo = resumir_pesquisa_web(research_payload)
             if resumo:
                 st.subheader("Referências encontradas na web")
-                for item in resumo:
-                    st.markdown(f"- {item}")
+                st.text("\n".join(f"- {item}" for item in resumo))
             # Mostrar plano final
             st.subheader("Plano final")
-            st.markdown(plan_markdown)
+            # Cada bloco é renderizado separadamente; as semanas ficam em expansores
+            # e apenas a primeira começa aberta.
+            for block in plan_sections["intro"]:
+                st.markdown(block)
+            if plan_sections["weeks"]:
+                st.markdown("## Semanas de treino")
+                for week_num, (title, week_md) in enumerate(plan_sections["weeks"], 1):
+                    with st.expander(title, expanded=(week_num == 1)):
+                        st.markdown(week_md)
+            for block in plan_sections["closing"]:
+                st.markdown(block)
 
 
 if __name__ == "__main__":